@@ -0,0 +1,23 @@
+import boto3
+from botocore.config import Config
+
+# Shared client settings: a connection pool large enough for the threaded
+# transfers, adaptive retries for S3 throttling, and TCP keepalive so
+# long-running jobs reuse connections instead of repeating TLS handshakes
+S3_CLIENT_CONFIG = Config(
+    max_pool_connections=64,
+    retries={'mode': 'adaptive', 'max_attempts': 10},
+    tcp_keepalive=True
+)
+
+def s3_client(**kwargs):
+    """
+    Create an S3 client with the project's shared configuration
+    
+    Args:
+        **kwargs: Extra arguments for boto3.client (e.g. region_name)
+    
+    Returns:
+        botocore.client.S3: Configured S3 client
+    """
+    return boto3.client('s3', config=S3_CLIENT_CONFIG, **kwargs)
@@ -1,20 +1,41 @@
 import os
+import errno
 import json
 import time
+import random
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from dateutil.relativedelta import relativedelta
 import copernicusmarine
-import boto3
+from boto3.s3.transfer import TransferConfig
+from boto3.exceptions import S3UploadFailedError
+from botocore.exceptions import ClientError, BotoCoreError, HTTPClientError
+from botocore.exceptions import ConnectionError as BotoConnectionError
 from dask.diagnostics import ProgressBar
+from _aws import s3_client
 
 # ---- CONFIG ----
 dataset_id = "cmems_mod_glo_wav_my_0.2deg_PT3H-i"
 bucket_name = "panthalassa-ocean-raw-data"
 local_temp_dir = "./temp_downloads"
-log_file = "./download_log.json"
-os.makedirs(local_temp_dir, exist_ok=True)
+log_file = "./download_log.txt"           # append-only, one chunk name per line
+legacy_log_file = "./download_log.json"  # JSON list written by earlier runs
+upload_workers = 3    # parallel S3 uploaders
+max_pending_files = 2 # NetCDFs allowed on disk waiting for upload
 
 # AWS S3 client
-s3 = boto3.client('s3')
+s3 = s3_client()
+
+# Multipart upload settings: 16 MB parts sent over parallel connections
+# instead of a single PUT stream per NetCDF
+transfer_config = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=16,
+    use_threads=True
+)
 
 # Spatial bounds
 min_lon, max_lon = 124.52, 144.6
@@ -25,81 +46,215 @@ start_date = datetime(1980, 1, 1, 21)
 end_date   = datetime(2023, 4, 30, 21)
 
 # ---- Logging ----
-if os.path.exists(log_file):
-    with open(log_file, "r") as f:
-        completed_chunks = json.load(f)
-else:
-    completed_chunks = []
+completed_chunks = set()
+log_fp = None  # opened by main()
+log_lock = threading.Lock()
+
+def load_log():
+    if os.path.exists(legacy_log_file):
+        with open(legacy_log_file, "r") as f:
+            completed_chunks.update(json.load(f))
+    if os.path.exists(log_file):
+        with open(log_file, "r") as f:
+            completed_chunks.update(f.read().splitlines())
 
-def save_log():
-    with open(log_file, "w") as f:
-        json.dump(completed_chunks, f, indent=2)
+def mark_completed(chunk_name):
+    # Append one line per chunk instead of rewriting the whole log
+    with log_lock:
+        completed_chunks.add(chunk_name)
+        log_fp.write(chunk_name + "\n")
+        log_fp.flush()
+        os.fsync(log_fp.fileno())
 
 # ---- Helper: generate 1-month chunks ----
 def generate_chunks(start, end):
     current = start
+    months = 1
     while current < end:
-        month = current.month % 12 + 1
-        year = current.year + (current.month // 12)
-        next_chunk = datetime(year, month, min(current.day, 28), current.hour)
-        if next_chunk > end:
-            next_chunk = end
+        # Offset from `start` (not `current`) so day 29-31 starts don't drift
+        next_chunk = start + relativedelta(months=months)
+        if next_chunk >= end:
+            yield current, end
+            return
         yield current, next_chunk
         current = next_chunk
+        months += 1
+
+# ---- Helper: NetCDF encoding ----
+# ~50 x 64 x 64 float32 chunks, aligned with the dask time chunks
+netcdf_chunk_sizes = {'time': 50, 'latitude': 64, 'longitude': 64}
+
+# Source packing/CF keys to carry over; passing encoding= replaces a variable's
+# whole .encoding, and dropping these would unpack int16 data to float
+preserved_encoding_keys = ('dtype', 'scale_factor', 'add_offset', '_FillValue',
+                           'missing_value', 'units', 'calendar')
+
+def netcdf_encoding(ds):
+    encoding = {}
+    for name, var in ds.data_vars.items():
+        encoding[name] = {
+            **{key: var.encoding[key] for key in preserved_encoding_keys if key in var.encoding},
+            'zlib': True,
+            'complevel': 1,
+            'shuffle': True,
+            'chunksizes': tuple(
+                min(netcdf_chunk_sizes.get(dim, size), size)
+                for dim, size in zip(var.dims, var.shape)
+            )
+        }
+    return encoding
 
 # ---- Retry helper ----
+# S3 error codes worth retrying; anything else (404, AccessDenied, ...) fails fast
+RETRYABLE_S3_CODES = {'SlowDown', 'InternalError', 'RequestTimeout',
+                      'ThrottlingException', 'ServiceUnavailable'}
+
+# OS-level error numbers that indicate a dropped or stalled connection
+TRANSIENT_ERRNOS = {errno.ECONNRESET, errno.ETIMEDOUT}
+
+def is_transient(error):
+    # upload_file wraps the underlying ClientError in S3UploadFailedError
+    if isinstance(error, S3UploadFailedError) and isinstance(error.__context__, ClientError):
+        error = error.__context__
+    if isinstance(error, ClientError):
+        return error.response.get('Error', {}).get('Code') in RETRYABLE_S3_CODES
+    if isinstance(error, BotoCoreError):
+        return isinstance(error, (BotoConnectionError, HTTPClientError))
+    # Only connection drops and timeouts are worth retrying; local failures
+    # such as ENOSPC from to_netcdf fail fast. HTTP client errors wrap the
+    # socket error, so check the whole cause chain.
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, (TimeoutError, ConnectionError)):
+            return True
+        if isinstance(error, OSError) and error.errno in TRANSIENT_ERRNOS:
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
 def retry(func, max_attempts=3, delay=10, *args, **kwargs):
     for attempt in range(1, max_attempts+1):
         try:
             return func(*args, **kwargs)
         except Exception as e:
             print(f"Attempt {attempt} failed: {e}")
-            if attempt < max_attempts:
-                print(f"Retrying in {delay} seconds...")
-                time.sleep(delay)
+            if attempt < max_attempts and is_transient(e):
+                # Exponential backoff with jitter
+                wait = delay * (2 ** (attempt - 1)) + random.uniform(0, delay)
+                print(f"Retrying in {wait:.1f} seconds...")
+                time.sleep(wait)
             else:
                 raise
 
-# ---- Download & upload loop ----
-for chunk_start, chunk_end in generate_chunks(start_date, end_date):
-    chunk_name = f"{chunk_start.strftime('%Y%m%d')}_{chunk_end.strftime('%Y%m%d')}"
-    if chunk_name in completed_chunks:
-        print(f"Skipping already completed chunk {chunk_name}")
-        continue
-
-    print(f"Processing chunk: {chunk_start} → {chunk_end}")
-
-    temp_file = os.path.join(local_temp_dir, f"{chunk_name}.nc")
-
-    # Download dataset chunk lazily
-    ds = retry(
-        copernicusmarine.open_dataset,
-        dataset_id=dataset_id,
-        start_datetime=chunk_start,
-        end_datetime=chunk_end,
-        minimum_longitude=min_lon,
-        maximum_longitude=max_lon,
-        minimum_latitude=min_lat,
-        maximum_latitude=max_lat,
-        chunk_size_limit=1000
-    )
-
-    print(f"Saving chunk to {temp_file} using dask...")
-    with ProgressBar():
-        retry(ds.chunk({'time': 50}).to_netcdf, path=temp_file)
-
-    # Organize S3 keys by year
-    s3_key = f"{chunk_start.year}/{chunk_name}.nc"
+# ---- Pipeline stages ----
+# Downloading month N+1 overlaps with uploading month N; the bounded
+# queue keeps at most `max_pending_files` NetCDFs on local disk.
+upload_queue = queue.Queue(maxsize=max_pending_files)
+upload_failed = threading.Event()
+stop_requested = threading.Event()  # set when the main thread is interrupted
+
+def download_worker():
+    try:
+        for chunk_start, chunk_end in generate_chunks(start_date, end_date):
+            if upload_failed.is_set():
+                print("Stopping downloads after upload failure.")
+                break
+            if stop_requested.is_set():
+                print("Stopping downloads after interrupt.")
+                break
+
+            chunk_name = f"{chunk_start.strftime('%Y%m%d')}_{chunk_end.strftime('%Y%m%d')}"
+            if chunk_name in completed_chunks:
+                print(f"Skipping already completed chunk {chunk_name}")
+                continue
+
+            print(f"Processing chunk: {chunk_start} → {chunk_end}")
+
+            temp_file = os.path.join(local_temp_dir, f"{chunk_name}.nc")
+
+            # Download dataset chunk lazily
+            ds = retry(
+                copernicusmarine.open_dataset,
+                dataset_id=dataset_id,
+                start_datetime=chunk_start,
+                end_datetime=chunk_end,
+                minimum_longitude=min_lon,
+                maximum_longitude=max_lon,
+                minimum_latitude=min_lat,
+                maximum_latitude=max_lat,
+                chunk_size_limit=1000
+            )
+
+            print(f"Saving chunk to {temp_file} using dask...")
+            with ProgressBar():
+                retry(ds.chunk({'time': 50}).to_netcdf, path=temp_file,
+                      engine='netcdf4', encoding=netcdf_encoding(ds))
+
+            # Organize S3 keys by year
+            s3_key = f"{chunk_start.year}/{chunk_name}.nc"
+            upload_queue.put((chunk_name, temp_file, s3_key))
+    finally:
+        # One sentinel per uploader so every worker shuts down
+        for _ in range(upload_workers):
+            upload_queue.put(None)
+
+def upload_chunk(chunk_name, temp_file, s3_key):
     print(f"Uploading {temp_file} to s3://{bucket_name}/{s3_key}...")
-    retry(s3.upload_file, Filename=temp_file, Bucket=bucket_name, Key=s3_key)
+    retry(s3.upload_file, Filename=temp_file, Bucket=bucket_name, Key=s3_key,
+          Config=transfer_config)
 
     # Remove local file
     os.remove(temp_file)
 
     # Log completed chunk
-    completed_chunks.append(chunk_name)
-    save_log()
+    mark_completed(chunk_name)
     print(f"Chunk {chunk_name} completed and uploaded.\n")
 
-print("All chunks downloaded and uploaded successfully.")
+def upload_worker():
+    while True:
+        item = upload_queue.get()
+        if item is None:
+            break
+        # Keep draining after a failure or interrupt so the downloader never
+        # blocks on a full queue
+        if upload_failed.is_set() or stop_requested.is_set():
+            continue
+        try:
+            upload_chunk(*item)
+        except Exception as e:
+            print(f"Upload of chunk {item[0]} failed: {e}")
+            upload_failed.set()
+
+# ---- Download & upload pipeline ----
+def main():
+    global log_fp
+
+    os.makedirs(local_temp_dir, exist_ok=True)
+    load_log()
+    log_fp = open(log_file, "a")
+
+    with ThreadPoolExecutor(max_workers=upload_workers + 1) as executor:
+        uploads = [executor.submit(upload_worker) for _ in range(upload_workers)]
+        download = executor.submit(download_worker)
+
+        # Surface any exception raised inside a worker; on Ctrl-C or an error,
+        # tell the workers to stop so the executor shutdown does not wait for
+        # every remaining month
+        try:
+            download.result()
+            for future in uploads:
+                future.result()
+        except BaseException:
+            stop_requested.set()
+            raise
+
+    log_fp.close()
+
+    if upload_failed.is_set():
+        raise RuntimeError("One or more chunk uploads failed; rerun to resume from the log.")
+
+    print("All chunks downloaded and uploaded successfully.")
 
+if __name__ == "__main__":
+    main()
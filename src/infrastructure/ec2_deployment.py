@@ -83,7 +83,7 @@ mkdir -p /home/ec2-user/noaa-processing
 cd /home/ec2-user/noaa-processing
 
 # Install required packages
-pip3 install boto3 pandas xarray netcdf4 numpy
+pip3 install boto3 pandas 'xarray>=2025.8' netcdf4 h5netcdf cfgrib numpy
 
 # Create NOAA processing script template
 cat > /home/ec2-user/noaa-processing/process_noaa.py << 'EOF'
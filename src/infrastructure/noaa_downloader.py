@@ -1,8 +1,10 @@
-import boto3
+from boto3.s3.transfer import TransferConfig
 import xarray as xr
 from io import BytesIO
 import os
 import json
+from concurrent.futures import ProcessPoolExecutor
+from _aws import s3_client
 
 # --- CONFIG ---
 source_bucket = 'noaa-nws-gefswaves-reforecast-pds'
@@ -10,73 +12,173 @@ source_prefix = 'GEFSv12/reforecast/2019/'
 destination_bucket = 'panthalassa-ocean-raw-data'
 destination_prefix = 'noaa-data/2019/'
 
+# Set all four bounds to None to copy the raw GRIBs unchanged
 lat_min, lat_max = 25, 30       # your latitude bounds
 lon_min, lon_max = -130, -120   # your longitude bounds
 
-local_tmp = '/tmp'  # small temporary folder for NetCDFs
-checkpoint_file = 'progress_checkpoint.json'
+local_tmp = '/tmp'  # small temporary folder for GRIBs
+checkpoint_file = 'progress_checkpoint.txt'          # append-only, one filename per line
+legacy_checkpoint_file = 'progress_checkpoint.json'  # JSON list written by earlier runs
+max_workers = os.cpu_count()  # one GRIB decode per core
+
+# Multipart upload/copy settings (16 MB parts, parallel connections)
+transfer_config = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=16,
+    use_threads=True
+)
+
+# Ranged-GET download settings: GRIBs are fetched in 16 MB parts over
+# parallel connections instead of one streamed GET held in memory
+download_config = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True
+)
 
 # --- S3 CLIENT ---
-s3 = boto3.client('s3')
-
-# --- LOAD OR INIT CHECKPOINT ---
-if os.path.exists(checkpoint_file):
-    with open(checkpoint_file, 'r') as f:
-        completed_files = set(json.load(f))
-else:
-    completed_files = set()
-
-# --- LIST 2019 FILES ---
-objects = s3.list_objects_v2(Bucket=source_bucket, Prefix=source_prefix)
-grib_files = [obj['Key'] for obj in objects.get('Contents', []) if obj['Key'].endswith('.grib2')]
-
-print(f"Found {len(grib_files)} files in 2019.")
-
-# --- PROCESS FILES ---
-for key in grib_files:
+# Created lazily so each worker process builds its own client
+# (boto3 clients are not safe to share across a fork).
+_s3 = None
+
+def get_s3():
+    global _s3
+    if _s3 is None:
+        _s3 = s3_client()
+    return _s3
+
+def needs_subset(lat_min, lat_max, lon_min, lon_max):
+    """
+    True if any spatial bound is set, i.e. the GRIB must be decoded and cut
+    """
+    return any(bound is not None for bound in (lat_min, lat_max, lon_min, lon_max))
+
+# --- PROCESS ONE FILE ---
+def process_one(key):
+    """
+    Subset one GRIB2 file to NetCDF and upload it, or copy it unchanged
+    when no subsetting is configured.
+    Returns the filename on success, None on failure.
+    """
+    s3 = get_s3()
     filename = key.split('/')[-1]
 
-    if filename in completed_files:
-        print(f"Skipping {filename} (already done).")
-        continue
-
     try:
         print(f"Processing {filename} ...")
 
-        # Stream from S3
-        obj = s3.get_object(Bucket=source_bucket, Key=key)
-        file_stream = BytesIO(obj['Body'].read())
-
-        # Open GRIB2 from memory
-        ds = xr.open_dataset(file_stream, engine='cfgrib')
-
-        # Subset coordinates
-        subset = ds.sel(latitude=slice(lat_min, lat_max),
-                        longitude=slice(lon_min, lon_max))
-
-        # Prepare local and destination paths
         date_folder = key.split('/')[4]  # e.g., '20190101'
+
+        if not needs_subset(lat_min, lat_max, lon_min, lon_max):
+            # Server-side multipart copy; the bytes never pass through this machine
+            dest_key = f"{destination_prefix}{date_folder}/{filename}"
+            s3.copy({'Bucket': source_bucket, 'Key': key}, destination_bucket, dest_key,
+                    Config=transfer_config)
+
+            print(f"Copied {filename}.")
+            return filename
+
+        # Download GRIB2 to local disk (cfgrib needs a seekable file path)
+        local_grib_path = os.path.join(local_tmp, filename)
+        s3.download_file(source_bucket, key, local_grib_path,
+                         Config=download_config)
+
+        try:
+            # Open GRIB2 from disk and subset coordinates; indexpath='' keeps
+            # the cfgrib index in memory instead of writing a .idx per file
+            with xr.open_dataset(local_grib_path, engine='cfgrib',
+                                 backend_kwargs={'indexpath': ''}) as ds:
+                subset = ds.sel(latitude=slice(lat_min, lat_max),
+                                longitude=slice(lon_min, lon_max)).load()
+        finally:
+            # Cleanup local GRIB
+            os.remove(local_grib_path)
+
+        # Prepare destination path
         netcdf_name = filename.replace('.grib2', '.nc')
-        local_nc_path = os.path.join(local_tmp, netcdf_name)
         dest_key = f"{destination_prefix}{date_folder}/{netcdf_name}"
 
-        # Save NetCDF locally
-        subset.to_netcdf(local_nc_path)
-
-        # Upload to your bucket
-        s3.upload_file(local_nc_path, destination_bucket, dest_key)
+        # Serialize the (small) subset to NetCDF in memory
+        encoding = {name: {'zlib': True, 'complevel': 1, 'shuffle': True}
+                    for name in subset.data_vars}
+        netcdf_bytes = subset.to_netcdf(engine='h5netcdf', encoding=encoding)
 
-        # Cleanup local file
-        os.remove(local_nc_path)
-
-        # Update checkpoint
-        completed_files.add(filename)
-        with open(checkpoint_file, 'w') as f:
-            json.dump(list(completed_files), f)
+        # Upload straight from memory to your bucket
+        s3.upload_fileobj(BytesIO(netcdf_bytes), destination_bucket, dest_key,
+                          Config=transfer_config)
 
         print(f"Completed {filename}.")
+        return filename
 
     except Exception as e:
         print(f"Error processing {filename}: {e}")
-        continue
+        return None
 
+def load_checkpoint():
+    completed_files = set()
+    if os.path.exists(legacy_checkpoint_file):
+        with open(legacy_checkpoint_file, 'r') as f:
+            completed_files.update(json.load(f))
+    if os.path.exists(checkpoint_file):
+        with open(checkpoint_file, 'r') as f:
+            completed_files.update(f.read().splitlines())
+    return completed_files
+
+def check_netcdf_backend():
+    """
+    Fail once, up front, if NetCDF4 bytes cannot be written in memory
+    (needs h5netcdf and xarray >= 2025.8); otherwise every file would
+    fail inside process_one and the run would upload nothing.
+    """
+    try:
+        xr.Dataset({'probe': ('x', [0.0])}).to_netcdf(engine='h5netcdf')
+    except (ImportError, ValueError) as e:
+        raise RuntimeError(
+            "In-memory NetCDF writes are unavailable; install h5netcdf and "
+            f"xarray>=2025.8 ({e})"
+        ) from e
+
+def main():
+    check_netcdf_backend()
+
+    # Local client for the listing; leaving _s3 unset means forked workers
+    # never inherit this client's pooled connections
+    s3 = s3_client()
+
+    # --- LOAD OR INIT CHECKPOINT ---
+    completed_files = load_checkpoint()
+
+    # --- LIST 2019 FILES ---
+    # Paginate: a single list_objects_v2 call stops at 1000 keys
+    paginator = s3.get_paginator('list_objects_v2')
+    grib_files = [obj['Key']
+                  for page in paginator.paginate(Bucket=source_bucket, Prefix=source_prefix)
+                  for obj in page.get('Contents', [])
+                  if obj['Key'].endswith('.grib2')]
+
+    print(f"Found {len(grib_files)} files in 2019.")
+
+    pending_keys = []
+    for key in grib_files:
+        filename = key.split('/')[-1]
+        if filename in completed_files:
+            print(f"Skipping {filename} (already done).")
+        else:
+            pending_keys.append(key)
+
+    # --- PROCESS FILES ---
+    with ProcessPoolExecutor(max_workers=max_workers) as executor, \
+            open(checkpoint_file, 'a') as checkpoint:
+        for filename in executor.map(process_one, pending_keys, chunksize=4):
+            if filename is None:
+                continue
+
+            # Update checkpoint: append one line rather than rewriting the set
+            completed_files.add(filename)
+            checkpoint.write(filename + '\n')
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,13 @@
-import boto3
 import json
+from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import ClientError
+from _aws import s3_client
 
 def create_panthalassa_buckets():
     """
     Create S3 buckets for Panthalassa ocean forecasting project
     """
-    s3 = boto3.client('s3', region_name='us-east-2')
+    s3 = s3_client(region_name='us-east-2')
     
     bucket_configs = [
         {
@@ -39,14 +40,18 @@ def create_panthalassa_buckets():
             
             print(f"Created bucket: {config['name']}")
             
-            # Create folder structure
-            for folder in config['folders']:
+            # Create folder structure (marker objects written in parallel)
+            def create_folder(folder):
                 s3.put_object(
                     Bucket=config['name'],
                     Key=folder,
-                    Body=''
+                    Body=b''
                 )
-                print(f"  Created folder: {folder}")
+                return folder
+            
+            with ThreadPoolExecutor(max_workers=len(config['folders'])) as executor:
+                for folder in executor.map(create_folder, config['folders']):
+                    print(f"  Created folder: {folder}")
                 
         except ClientError as e:
             if e.response['Error']['Code'] == 'BucketAlreadyOwnedByYou':
@@ -58,7 +63,7 @@ def configure_bucket_policies():
     """
     Set up bucket policies for data access
     """
-    s3 = boto3.client('s3')
+    s3 = s3_client()
     
     # Example policy for allowing EC2 instances access
     bucket_policy = {
@@ -80,7 +85,7 @@ def list_bucket_contents():
     """
     Utility function to check bucket contents
     """
-    s3 = boto3.client('s3')
+    s3 = s3_client()
     
     buckets = [
         'panthalassa-ocean-raw-data',
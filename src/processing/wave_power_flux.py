@@ -1,6 +1,8 @@
 import numpy as np
 import pandas as pd
 import xarray as xr
+import dask
+import dask.array as da
 from datetime import datetime
 
 def calculate_wave_power_flux(wave_height, wave_period, water_density=1025, gravity=9.81):
@@ -22,31 +24,89 @@ def calculate_wave_power_flux(wave_height, wave_period, water_density=1025, grav
         gravity (float): Gravitational acceleration in m/s²
     
     Returns:
-        array: Wave power flux in W/m
+        array: Wave power flux in W/m (float32)
     """
-    # Calculate wave power flux coefficient
-    coefficient = (water_density * gravity**2) / (64 * np.pi)
+    # Calculate wave power flux coefficient (float32 so it does not upcast the arrays)
+    coefficient = np.float32((water_density * gravity**2) / (64 * np.pi))
     
     # Calculate power flux: P = coefficient * H² * T
-    power_flux = coefficient * (wave_height**2) * wave_period
+    if isinstance(wave_height, (xr.DataArray, xr.Dataset)) or isinstance(wave_period, (xr.DataArray, xr.Dataset)):
+        # Run the fused kernel per block so dask-backed data stays lazy
+        power_flux = xr.apply_ufunc(
+            _power_flux_kernel,
+            wave_height,
+            wave_period,
+            kwargs={'coefficient': coefficient},
+            join='inner',  # same alignment as plain DataArray arithmetic
+            dask='parallelized',
+            output_dtypes=[np.float32]
+        )
+    elif isinstance(wave_height, np.ndarray) and isinstance(wave_period, np.ndarray):
+        power_flux = _power_flux_kernel(wave_height, wave_period, coefficient)
+    else:
+        # Scalars, pandas objects etc. keep their own type (and index)
+        power_flux = coefficient * (wave_height**2) * wave_period
     
     return power_flux
 
-def calculate_monthly_aggregations(power_flux_data, time_coord):
+def _power_flux_kernel(wave_height, wave_period, coefficient):
+    """
+    Compute coefficient * H² * T in a single preallocated output buffer
+    
+    Avoids the intermediate H² and H² * T arrays that the plain
+    expression allocates; the three multiplications run in place on one
+    output buffer. Inputs are cast to float32 (a copy unless they are
+    already float32); wave heights and periods carry only a few
+    significant digits, and the smaller dtype halves memory traffic.
+    """
+    wave_height = np.asarray(wave_height, dtype=np.float32)
+    wave_period = np.asarray(wave_period, dtype=np.float32)
+    shape = np.broadcast_shapes(wave_height.shape, wave_period.shape)
+    
+    power_flux = np.empty(shape, dtype=np.float32)
+    np.multiply(wave_height, wave_height, out=power_flux)
+    np.multiply(power_flux, wave_period, out=power_flux)
+    np.multiply(power_flux, coefficient, out=power_flux)
+    
+    return power_flux
+
+def get_month_array(power_flux_data, time_coord):
+    """
+    Decode the month number of every timestep once
+    
+    Pass the result as ``month_array`` to calculate_monthly_aggregations
+    and calculate_seasonal_ratio to avoid decoding the time coordinate
+    again in each of them.
+    
+    Args:
+        power_flux_data (xarray.Dataset): Data with time dimension
+        time_coord (str): Name of time coordinate
+    
+    Returns:
+        numpy.ndarray: Month (1-12) for each timestep
+    """
+    return power_flux_data[time_coord].dt.month.values
+
+def calculate_monthly_aggregations(power_flux_data, time_coord, month_array=None):
     """
     Calculate monthly statistics for wave power flux
     
     Args:
         power_flux_data (xarray.Dataset): Power flux data with time dimension
         time_coord (str): Name of time coordinate
+        month_array (numpy.ndarray): Optional precomputed months from get_month_array
     
     Returns:
         dict: Monthly statistics
     """
     monthly_stats = {}
     
+    if month_array is None:
+        month_array = get_month_array(power_flux_data, time_coord)
+    
     # Group by month and calculate statistics
-    monthly_grouped = power_flux_data.groupby(f'{time_coord}.month')
+    months = xr.DataArray(month_array, dims=power_flux_data[time_coord].dims, name='month')
+    monthly_grouped = power_flux_data.groupby(months)
     
     monthly_stats['mean'] = monthly_grouped.mean()
     monthly_stats['std'] = monthly_grouped.std()
@@ -55,21 +115,64 @@ def calculate_monthly_aggregations(power_flux_data, time_coord):
     
     return monthly_stats
 
-def calculate_consistency_metrics(power_flux_data, threshold_percentile=75):
+def calculate_basic_statistics(power_flux_data):
+    """
+    Calculate count, mean, std, min and max of wave power flux in one pass
+    
+    For dask-backed data all five reductions are evaluated in a single
+    dask.compute, so the cube is read once.
+    
+    Args:
+        power_flux_data (xarray.DataArray): Wave power flux data
+    
+    Returns:
+        dict: Statistics with keys count, mean, std, min, max
+    """
+    count, mean, std, data_min, data_max = dask.compute(
+        power_flux_data.count(),
+        power_flux_data.mean(skipna=True, dtype=np.float64),
+        power_flux_data.std(skipna=True, dtype=np.float64),
+        power_flux_data.min(skipna=True),
+        power_flux_data.max(skipna=True)
+    )
+    
+    return {
+        'count': int(count),
+        'mean': float(mean),
+        'std': float(std),
+        'min': float(data_min),
+        'max': float(data_max)
+    }
+
+def calculate_consistency_metrics(power_flux_data, threshold_percentile=75, statistics=None):
     """
     Calculate consistency metrics for wave power assessment
     
     Args:
-        power_flux_data (array): Wave power flux time series
+        power_flux_data (array or xarray.DataArray): Wave power flux data;
+            dask-backed DataArrays are reduced chunk by chunk, with the
+            threshold, median and above-threshold count estimated from a
+            histogram (error below one bin width, i.e. 1/10000 of the data range)
         threshold_percentile (float): Percentile for threshold calculation
+        statistics (dict): Optional calculate_basic_statistics result for the
+            same data; reused on the dask path instead of re-reading the data
     
     Returns:
         dict: Consistency metrics
     """
-    # Remove NaN values
-    clean_data = power_flux_data[~np.isnan(power_flux_data)]
+    is_dask = isinstance(power_flux_data, xr.DataArray) and power_flux_data.chunks is not None
     
-    if len(clean_data) == 0:
+    if is_dask:
+        if statistics is None:
+            statistics = calculate_basic_statistics(power_flux_data)
+        valid_count = statistics['count']
+    else:
+        # Copy out the NaN-free values once; every statistic below reuses them
+        clean_data = np.asarray(power_flux_data)
+        clean_data = clean_data[~np.isnan(clean_data)]
+        valid_count = clean_data.size
+    
+    if valid_count == 0:
         return {
             'std_deviation': np.nan,
             'coefficient_of_variation': np.nan,
@@ -78,44 +181,108 @@ def calculate_consistency_metrics(power_flux_data, threshold_percentile=75):
             'seasonal_ratio': np.nan
         }
     
-    # Calculate threshold value
-    threshold = np.percentile(clean_data, threshold_percentile)
+    if is_dask:
+        mean_power = statistics['mean']
+        std_deviation = statistics['std']
+        
+        # An exact quantile would merge the cube into a single chunk; one
+        # histogram pass gives threshold, median and above-threshold count
+        (threshold, median_power), (above_threshold, _) = _histogram_percentiles(
+            power_flux_data.data, statistics['min'], statistics['max'], [threshold_percentile, 50]
+        )
+    else:
+        # Mean once, then std from that mean with a single squared-deviation buffer
+        mean_power = clean_data.mean()
+        deviations = clean_data - mean_power
+        np.square(deviations, out=deviations)
+        std_deviation = np.sqrt(deviations.mean())
+        del deviations
+        
+        # Threshold and median share a single partition; clean_data is our own
+        # copy and the count below does not depend on order, so partition in place
+        threshold, median_power = np.percentile(
+            clean_data, [threshold_percentile, 50], overwrite_input=True
+        )
+        above_threshold = np.count_nonzero(clean_data > threshold)
     
     # Calculate metrics
     metrics = {
-        'std_deviation': np.std(clean_data),
-        'coefficient_of_variation': np.std(clean_data) / np.mean(clean_data) if np.mean(clean_data) > 0 else np.nan,
-        'percent_above_threshold': (np.sum(clean_data > threshold) / len(clean_data)) * 100,
+        'std_deviation': std_deviation,
+        'coefficient_of_variation': std_deviation / mean_power if mean_power > 0 else np.nan,
+        'percent_above_threshold': (above_threshold / valid_count) * 100,
         'threshold_value': threshold,
-        'mean_power': np.mean(clean_data),
-        'median_power': np.median(clean_data)
+        'mean_power': mean_power,
+        'median_power': median_power
     }
     
     return metrics
 
-def calculate_seasonal_ratio(power_flux_data, time_coord):
+def _histogram_percentiles(data, data_min, data_max, percentiles, bins=10000):
+    """
+    Estimate percentiles of a dask array from a chunk-wise histogram
+    
+    Interpolates linearly within the bin that holds each target rank,
+    so each value is within one bin width of np.nanpercentile. Also
+    returns, per percentile, the estimated number of values above it
+    (bins above plus the interpolated share of its own bin).
+    
+    Returns:
+        tuple: (list of percentile values, list of counts above each)
+    """
+    if data_min == data_max:
+        return [data_min for _ in percentiles], [0 for _ in percentiles]
+    
+    # NaN falls outside the explicit range and is not counted
+    counts, edges = da.histogram(data, bins=bins, range=(data_min, data_max))
+    counts = counts.compute()
+    cumulative = np.cumsum(counts)
+    
+    estimates = []
+    counts_above = []
+    for percentile in percentiles:
+        rank = percentile / 100 * (cumulative[-1] - 1)
+        i = np.searchsorted(cumulative, rank, side='right')
+        i = min(i, bins - 1)
+        below = cumulative[i - 1] if i > 0 else 0
+        fraction = (rank - below) / counts[i] if counts[i] > 0 else 0.0
+        estimates.append(float(edges[i] + fraction * (edges[i + 1] - edges[i])))
+        counts_above.append(int(round((cumulative[-1] - cumulative[i]) + counts[i] * (1 - fraction))))
+    
+    return estimates, counts_above
+
+def calculate_seasonal_ratio(power_flux_data, time_coord, month_array=None):
     """
     Calculate ratio of winter to summer wave power (seasonality indicator)
     
     Args:
         power_flux_data (xarray.Dataset): Power flux data
         time_coord (str): Name of time coordinate
+        month_array (numpy.ndarray): Optional precomputed months from get_month_array
         
     Returns:
         float: Winter/summer power ratio
     """
-    # Define seasons (Northern Hemisphere)
-    winter_months = [12, 1, 2]
-    summer_months = [6, 7, 8]
+    if month_array is None:
+        month_array = get_month_array(power_flux_data, time_coord)
     
-    # Extract seasonal data
-    winter_data = power_flux_data.where(
-        power_flux_data[time_coord].dt.month.isin(winter_months)
-    ).mean()
+    # Define seasons (Northern Hemisphere): winter = DJF, summer = JJA
+    winter_mask = (month_array == 12) | (month_array == 1) | (month_array == 2)
+    summer_mask = (month_array == 6) | (month_array == 7) | (month_array == 8)
+    
+    time_dims = power_flux_data[time_coord].dims
     
-    summer_data = power_flux_data.where(
-        power_flux_data[time_coord].dt.month.isin(summer_months)
-    ).mean()
+    # Extract seasonal data
+    if len(time_dims) == 1:
+        # Select seasonal timesteps by index rather than NaN-masking the whole
+        # cube; the dimension need not be time_coord itself (e.g. cfgrib's
+        # valid_time along 'step')
+        winter_data = power_flux_data.isel({time_dims[0]: np.flatnonzero(winter_mask)}).mean()
+        summer_data = power_flux_data.isel({time_dims[0]: np.flatnonzero(summer_mask)}).mean()
+    else:
+        # Scalar or multi-dimensional time coordinates (e.g. valid_time over
+        # time x step) cannot be indexed along one dimension, so mask instead
+        winter_data = power_flux_data.where(xr.DataArray(winter_mask, dims=time_dims)).mean()
+        summer_data = power_flux_data.where(xr.DataArray(summer_mask, dims=time_dims)).mean()
     
     # Calculate ratio
     if summer_data > 0:
@@ -165,28 +332,32 @@ def rank_sites_by_potential(power_flux_data, lat_coord='latitude', lon_coord='lo
     # Flatten spatial data
     flattened = power_flux_data.stack(location=(lat_coord, lon_coord))
     
-    # Remove NaN values and sort
+    # Remove NaN values
     valid_data = flattened.dropna('location')
-    sorted_data = valid_data.sortby(valid_data, ascending=False)
     
-    # Extract top sites
-    top_sites = sorted_data.isel(location=slice(0, top_n))
+    # Partition out the top N sites, then sort only those
+    values = valid_data.values
+    top_n = max(0, min(top_n, len(values)))
+    if top_n < len(values):
+        top_idx = np.argpartition(-values, top_n - 1)[:top_n]
+    else:
+        top_idx = np.arange(len(values))
+    top_idx = top_idx[np.argsort(-values[top_idx], kind='stable')]
     
-    # Create results dataframe
-    results = []
-    for i in range(len(top_sites)):
-        lat, lon = top_sites.location.values[i]
-        power = float(top_sites.values[i])
-        
-        results.append({
-            'rank': i + 1,
-            'latitude': lat,
-            'longitude': lon,
-            'wave_power_flux_w_per_m': power,
-            'location_description': f"Site {i+1}"
-        })
-    
-    return pd.DataFrame(results)
+    # Extract top sites
+    top_sites = valid_data.isel(location=top_idx)
+    
+    # Create results dataframe from columnar arrays
+    location_index = top_sites.get_index('location')
+    ranks = np.arange(1, len(top_sites) + 1)
+    
+    return pd.DataFrame({
+        'rank': ranks,
+        'latitude': location_index.get_level_values(lat_coord).values,
+        'longitude': location_index.get_level_values(lon_coord).values,
+        'wave_power_flux_w_per_m': top_sites.values.astype(float),
+        'location_description': [f"Site {rank}" for rank in ranks]
+    })
 
 def process_copernicus_wave_data(ds):
     """
@@ -218,6 +389,12 @@ def process_copernicus_wave_data(ds):
         'long_name': 'Wave Power Flux',
         'description': 'Wave power per unit width of wave front'
     }
+    ds['wave_power_flux'].encoding = {
+        'dtype': 'float32',
+        'zlib': True,
+        'complevel': 1,
+        'shuffle': True
+    }
     
     return ds
 
@@ -237,6 +414,9 @@ def generate_processing_summary(ds, region_name="Pacific Northwest"):
     
     power_data = ds['wave_power_flux']
     
+    # One pass for the overall statistics, reused by the consistency metrics
+    power_statistics = calculate_basic_statistics(power_data)
+    
     summary = {
         'region': region_name,
         'processing_date': datetime.now().isoformat(),
@@ -253,12 +433,12 @@ def generate_processing_summary(ds, region_name="Pacific Northwest"):
             'grid_points': len(ds.latitude) * len(ds.longitude)
         },
         'wave_power_statistics': {
-            'mean_power_w_per_m': float(power_data.mean()),
-            'max_power_w_per_m': float(power_data.max()),
-            'min_power_w_per_m': float(power_data.min()),
-            'std_power_w_per_m': float(power_data.std())
+            'mean_power_w_per_m': power_statistics['mean'],
+            'max_power_w_per_m': power_statistics['max'],
+            'min_power_w_per_m': power_statistics['min'],
+            'std_power_w_per_m': power_statistics['std']
         },
-        'consistency_metrics': calculate_consistency_metrics(power_data.values.flatten())
+        'consistency_metrics': calculate_consistency_metrics(power_data, statistics=power_statistics)
     }
     
     return summary
\ No newline at end of file
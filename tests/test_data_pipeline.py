@@ -0,0 +1,43 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+# Infrastructure scripts are run directly, so import them from their folder
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'infrastructure'))
+
+pytest.importorskip('copernicusmarine')
+
+from copernicus_downloader import generate_chunks
+
+
+def test_generate_chunks_day_31_start_does_not_drift():
+    chunks = list(generate_chunks(datetime(2020, 1, 31), datetime(2020, 5, 15)))
+
+    assert chunks == [
+        (datetime(2020, 1, 31), datetime(2020, 2, 29)),
+        (datetime(2020, 2, 29), datetime(2020, 3, 31)),
+        (datetime(2020, 3, 31), datetime(2020, 4, 30)),
+        (datetime(2020, 4, 30), datetime(2020, 5, 15)),
+    ]
+
+
+def test_generate_chunks_end_on_month_boundary():
+    chunks = list(generate_chunks(datetime(2020, 1, 1, 21), datetime(2020, 3, 1, 21)))
+
+    # No trailing zero-length chunk when end falls exactly on a boundary
+    assert chunks == [
+        (datetime(2020, 1, 1, 21), datetime(2020, 2, 1, 21)),
+        (datetime(2020, 2, 1, 21), datetime(2020, 3, 1, 21)),
+    ]
+
+
+def test_generate_chunks_cover_range_contiguously():
+    start, end = datetime(1980, 1, 1, 21), datetime(2023, 4, 30, 21)
+    chunks = list(generate_chunks(start, end))
+
+    assert chunks[0][0] == start
+    assert chunks[-1][1] == end
+    assert all(chunk_start < chunk_end for chunk_start, chunk_end in chunks)
+    assert all(previous[1] == current[0] for previous, current in zip(chunks, chunks[1:]))